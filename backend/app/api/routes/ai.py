@@ -0,0 +1,367 @@
+"""AI endpoints: sketch-to-code generation and chat assistance."""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import orjson
+
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict
+
+from app.monitoring.metrics import metrics_collector
+from app.services.ai_service import ai_service
+from app.utils.image_processing import process_image_for_ai
+from app.utils.validation import (
+    validate_conversation_id,
+    validate_image,
+    validate_instructions,
+)
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/ai", tags=["AI"], default_response_class=ORJSONResponse)
+
+# Static payload for /supported-frameworks, built once at import time
+_SUPPORTED_FRAMEWORKS = {
+    "success": True,
+    "frameworks": [
+        {
+            "id": "vue",
+            "name": "Vue 3",
+            "description": "Single-file components with <script setup> and Tailwind CSS",
+        }
+    ],
+    "default": "vue",
+}
+
+
+# Request / response models
+class TokenUsage(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+
+class ComponentAnalysis(BaseModel):
+    interactivity: dict = {}
+    animations: dict = {}
+    uses_tailwind: bool = False
+
+
+class CodeGenerationResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    success: bool
+    generated_code: str
+    framework: str = "vue"
+    processing_time_ms: int
+    token_usage: TokenUsage
+    component_analysis: ComponentAnalysis
+    has_animations: bool = False
+    has_hover_effects: bool = False
+    timestamp: str
+
+
+class ChatRequest(BaseModel):
+    message: str
+    context: dict | None = None
+    conversation_id: str | None = None
+    # Duplicate prompts (UI retries, double sends) may be answered from the
+    # in-process cache unless the client opts out.
+    cacheable: bool = True
+
+
+class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    success: bool
+    response: str
+    conversation_id: str | None = None
+    token_usage: TokenUsage
+    timestamp: str
+
+
+def _record_failure(start_ns: int):
+    """Record a failed generation without repeating the kwargs per branch."""
+    metrics_collector.record_ai_generation(
+        framework="vue",
+        tokens_used=0,
+        cost_usd=0.0,
+        processing_time_ms=(time.perf_counter_ns() - start_ns) // 1_000_000,
+        has_animations=False,
+        success=False,
+    )
+
+
+@router.post("/generate-code", response_model=CodeGenerationResponse)
+async def generate_code_from_sketch(
+    image: UploadFile = File(...),
+    additional_instructions: str = Form(""),
+):
+    """Convert an uploaded UI sketch into a Vue component."""
+    start_ns = time.perf_counter_ns()
+    try:
+        instructions = validate_instructions(additional_instructions)
+        upload_size = await validate_image(image)
+        # Pillow decodes straight from the UploadFile's spooled temp file,
+        # so the raw upload is never duplicated into a Python buffer.
+        processed_data, image_format = await process_image_for_ai(
+            image.file, image.content_type
+        )
+        logger.info(
+            "Processing sketch: %d bytes in, %d bytes after preprocessing",
+            upload_size,
+            len(processed_data),
+        )
+
+        result = await ai_service.generate_code_from_image(
+            processed_data, image_format, instructions
+        )
+
+        processing_time_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+        now_iso = datetime.now(timezone.utc).isoformat()
+        meta = result.get("metadata") or {}
+        token_usage = result.get("token_usage") or {}
+        component_prediction = meta.get("component_prediction") or {}
+        metrics_collector.record_ai_generation(
+            framework="vue",
+            tokens_used=token_usage.get("total_tokens", 0),
+            cost_usd=0.0,
+            processing_time_ms=processing_time_ms,
+            has_animations=meta.get("has_animations", False),
+            success=True,
+        )
+        # The payload is built internally and already typed; returning a
+        # Response directly skips FastAPI's second validation pass.
+        return ORJSONResponse(
+            {
+                "success": True,
+                "generated_code": result.get("generated_code", ""),
+                "framework": "vue",
+                "processing_time_ms": processing_time_ms,
+                "token_usage": token_usage,
+                "component_analysis": component_prediction,
+                "has_animations": meta.get("has_animations", False),
+                "has_hover_effects": meta.get("has_hover_effects", False),
+                "timestamp": now_iso,
+            }
+        )
+    except HTTPException:
+        _record_failure(start_ns)
+        raise
+    except Exception as e:
+        logger.error("Failed to generate code from sketch: %s", e)
+        _record_failure(start_ns)
+        raise HTTPException(status_code=500, detail="Failed to generate code from sketch")
+
+
+@router.post("/generate-code-stream")
+async def stream_code_from_sketch(
+    image: UploadFile = File(...),
+    additional_instructions: str = Form(""),
+):
+    """Stream the generated component as Server-Sent Events.
+
+    Each completion chunk is forwarded as a ``delta`` event the moment
+    Azure emits it, so the client can render code progressively instead
+    of staring at a spinner for the full generation. A final ``done``
+    event carries the assembled code, token usage and analysis metadata,
+    followed by the SSE ``[DONE]`` terminator.
+    """
+    start_ns = time.perf_counter_ns()
+    instructions = validate_instructions(additional_instructions)
+    await validate_image(image)
+    processed_data, image_format = await process_image_for_ai(
+        image.file, image.content_type
+    )
+
+    async def event_stream():
+        try:
+            async for event in ai_service.stream_code_from_image(
+                processed_data, image_format, instructions
+            ):
+                if event["type"] == "done":
+                    meta = event.get("metadata") or {}
+                    token_usage = event.get("token_usage") or {}
+                    metrics_collector.record_ai_generation(
+                        framework="vue",
+                        tokens_used=token_usage.get("total_tokens", 0),
+                        cost_usd=0.0,
+                        processing_time_ms=(time.perf_counter_ns() - start_ns)
+                        // 1_000_000,
+                        has_animations=meta.get("has_animations", False),
+                        success=True,
+                    )
+                yield b"data: " + orjson.dumps(event) + b"\n\n"
+        except HTTPException as e:
+            _record_failure(start_ns)
+            yield b"data: " + orjson.dumps(
+                {"type": "error", "status": e.status_code, "detail": e.detail}
+            ) + b"\n\n"
+        except Exception as e:
+            logger.error("Streaming generation failed: %s", e)
+            _record_failure(start_ns)
+            yield b"data: " + orjson.dumps(
+                {"type": "error", "status": 500, "detail": "Generation failed"}
+            ) + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+# LRU response cache for identical chat prompts: inference is the expensive
+# part, so duplicate sends should not cost a second Azure round-trip.
+_CHAT_CACHE: OrderedDict = OrderedDict()
+_CHAT_CACHE_LOCK = asyncio.Lock()
+_CHAT_CACHE_MAX = 1024
+_CHAT_CACHE_TTL = 600.0  # seconds
+
+
+def _chat_cache_key(message: str, context, conversation_id):
+    context_hash = (
+        hashlib.sha1(orjson.dumps(context, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        if context
+        else ""
+    )
+    return (message, context_hash, conversation_id)
+
+
+async def _cached_chat_assistance(message: str, context, conversation_id):
+    key = _chat_cache_key(message, context, conversation_id)
+    now = time.monotonic()
+    async with _CHAT_CACHE_LOCK:
+        entry = _CHAT_CACHE.get(key)
+        if entry is not None:
+            ts, result = entry
+            if now - ts < _CHAT_CACHE_TTL:
+                _CHAT_CACHE.move_to_end(key)
+                return result
+            del _CHAT_CACHE[key]
+
+    result = await ai_service.chat_assistance(message, context, conversation_id)
+
+    async with _CHAT_CACHE_LOCK:
+        _CHAT_CACHE[key] = (now, result)
+        _CHAT_CACHE.move_to_end(key)
+        while len(_CHAT_CACHE) > _CHAT_CACHE_MAX:
+            _CHAT_CACHE.popitem(last=False)
+    return result
+
+
+@router.post(
+    "/chat",
+    response_model=ChatResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": ChatRequest.model_json_schema()}
+            },
+        }
+    },
+)
+async def chat_assistance(request: Request):
+    """Chat endpoint for follow-up questions about generated code."""
+    # The body is decoded by hand with orjson instead of a per-request
+    # Pydantic model: the schema is three flat fields, so full validation is
+    # pure overhead at high chat RPS. ChatRequest is kept for OpenAPI docs.
+    try:
+        data = orjson.loads(await request.body())
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    message = data.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise HTTPException(status_code=422, detail="message is required")
+    context = data.get("context")
+    if context is not None and not isinstance(context, dict):
+        raise HTTPException(status_code=422, detail="context must be an object")
+    cacheable = bool(data.get("cacheable", True))
+
+    try:
+        conversation_id = validate_conversation_id(data.get("conversation_id"))
+        if cacheable:
+            result = await _cached_chat_assistance(message, context, conversation_id)
+        else:
+            result = await ai_service.chat_assistance(message, context, conversation_id)
+        return ORJSONResponse(
+            {
+                "success": True,
+                "response": result.get("response", ""),
+                "conversation_id": result.get("conversation_id"),
+                "token_usage": result.get("token_usage") or {},
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Chat assistance failed: %s", e)
+        raise HTTPException(status_code=500, detail="Chat assistance failed")
+
+
+@router.get("/supported-frameworks")
+async def get_supported_frameworks():
+    """List the output frameworks the generator supports."""
+    return ORJSONResponse(
+        {**_SUPPORTED_FRAMEWORKS, "timestamp": datetime.now(timezone.utc).isoformat()}
+    )
+
+
+@router.get("/config-check")
+async def check_ai_configuration():
+    """Report which parts of the Azure OpenAI configuration are present."""
+    return ORJSONResponse(
+        {
+            "success": True,
+            "config_status": ai_service._config_snapshot,
+            "endpoints_configured": ai_service.is_configured(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+@router.get("/metrics")
+async def get_metrics(hours: int = 1):
+    """Expose the in-memory metrics summary."""
+    return ORJSONResponse(
+        {
+            "success": True,
+            "metrics": metrics_collector.get_summary(hours),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+@router.get("/health-detailed")
+async def get_detailed_health():
+    """Health check combining traffic stats and AI configuration."""
+    return ORJSONResponse(
+        {
+            "success": True,
+            "monitoring": metrics_collector.get_health_status(),
+            "ai_inflight_requests": ai_service.inflight_requests,
+            "config_status": ai_service._config_snapshot,
+            "endpoints_configured": ai_service.is_configured(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
+
+
+@router.get("/health")
+async def check_ai_health():
+    """Health check for the AI service."""
+    result = await ai_service.health_check()
+    return ORJSONResponse(
+        {
+            "service": "ai",
+            **result,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        }
+    )
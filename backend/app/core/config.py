@@ -0,0 +1,140 @@
+"""Application settings loaded from the environment / ``.env`` file."""
+
+from functools import cached_property, lru_cache
+
+from pydantic import field_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    # Settings never change after startup, so the model is frozen: no
+    # per-assignment validation, and derived views can be cached safely.
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        extra="ignore",
+        frozen=True,
+    )
+
+    app_name: str = "Canvas Smith API"
+    version: str = "1.0.0"
+    environment: str = "development"
+    debug: bool = False
+
+    # Single-container deployment: the backend serves the built frontend
+    serve_frontend: bool = True
+    static_dir: str = "static"
+
+    # "*" makes Starlette's CORS middleware take its allow-all fast path;
+    # listing specific dev hosts next to "*" only added a per-request
+    # origin scan that could never reject anything. Restrict via the
+    # CORS_ORIGINS env var in production.
+    cors_origins: tuple[str, ...] = ("*",)
+
+    # Upload limits — a frozenset so the per-upload content-type check is
+    # a single O(1) hash lookup
+    allowed_image_types: frozenset[str] = frozenset(
+        {
+            "image/jpeg",
+            "image/png",
+            "image/gif",
+            "image/webp",
+            "image/bmp",
+            "image/tiff",
+            "image/svg+xml",
+        }
+    )
+    max_image_size: int = 10 * 1024 * 1024  # 10 MB
+    max_instructions_length: int = 1000
+
+    # Azure OpenAI
+    azure_openai_api_key: str = ""
+    azure_openai_endpoint: str = ""
+    azure_openai_deployment: str = "gpt-4o"
+    azure_openai_api_version: str = "2024-06-01"
+    azure_openai_max_tokens: int = 4096
+    azure_openai_timeout: float = 120.0
+    azure_openai_max_retries: int = 3
+    azure_openai_max_concurrency: int = 10
+    azure_openai_rpm: float = 60.0
+    # Reuse generation results for identical / near-identical sketches
+    ai_cache_enabled: bool = True
+    # Gzip outbound request bodies (base64 images compress ~25-30%).
+    # Off by default: not every Azure OpenAI deployment accepts
+    # Content-Encoding: gzip, so verify before enabling.
+    azure_openai_gzip_requests: bool = False
+
+    # Per-client rate limiting
+    rate_limit_requests: int = 100
+    rate_limit_window: int = 60
+
+    # Optional integrations
+    sentry_dsn: str | None = None
+    appinsights_connection_string: str | None = None
+    redis_url: str | None = None
+
+    @field_validator("allowed_image_types", mode="before")
+    @classmethod
+    def _split_image_types(cls, value):
+        """Allow a comma-separated env var, e.g. ``image/png,image/jpeg``."""
+        if isinstance(value, str) and not value.lstrip().startswith(("[", "{")):
+            return frozenset(t.strip() for t in value.split(",") if t.strip())
+        return value
+
+    # The views are immutable, so the accessors hand out shared instances
+    # instead of copying per call.
+    def get_cors_origins_list(self) -> tuple:
+        return self.cors_origins
+
+    @cached_property
+    def _allowed_image_types_tuple(self) -> tuple:
+        return tuple(sorted(self.allowed_image_types))
+
+    def get_allowed_image_types_list(self) -> tuple:
+        return self._allowed_image_types_tuple
+
+    @cached_property
+    def is_prod(self) -> bool:
+        return self.environment.lower() in {"production", "prod"}
+
+    # Optional integrations are lazy: the client libraries are only
+    # imported — and the URLs/DSNs only parsed — on first use, so an
+    # unconfigured subsystem costs nothing at startup.
+    @cached_property
+    def redis(self):
+        """Shared Redis client, or ``None`` when ``redis_url`` is unset."""
+        if not self.redis_url:
+            return None
+        from redis import Redis
+
+        return Redis.from_url(self.redis_url)
+
+    @cached_property
+    def sentry(self):
+        """Initialized sentry_sdk module, or ``None`` when no DSN is set."""
+        if not self.sentry_dsn:
+            return None
+        import sentry_sdk
+
+        sentry_sdk.init(self.sentry_dsn, environment=self.environment)
+        return sentry_sdk
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the process-wide Settings instance.
+
+    Construction (``.env`` parsing + validation) runs once; repeated calls
+    — including FastAPI ``Depends(get_settings)`` — return the cached
+    instance, and tests can override it via ``app.dependency_overrides``.
+    """
+    return Settings()
+
+
+# Force the pydantic core-schema build at import time — combined with the
+# eager get_settings() call below, the first request never pays for lazy
+# schema compilation or .env parsing.
+Settings.model_rebuild(force=True)
+
+# Back-compat module-level accessor for existing call sites
+settings = get_settings()
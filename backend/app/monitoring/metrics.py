@@ -0,0 +1,476 @@
+"""In-memory metrics collection, request instrumentation and rate limiting."""
+
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import NamedTuple
+
+from fastapi.responses import JSONResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# One bucket per minute, 24h of history
+_BUCKET_RING_SIZE = 1440
+
+# Response times are tracked in a power-of-two histogram: slot i counts
+# requests with latency in [2**(i-1), 2**i) ms, so 32 slots cover any
+# realistic latency with ~2x worst-case quantile error and O(1) recording.
+_HIST_SLOTS = 32
+
+
+class _ErrorEvent(NamedTuple):
+    ts: float
+    endpoint: str
+    status_code: int
+
+
+class _AIEvent(NamedTuple):
+    ts: float
+    framework: str
+    tokens_used: int
+    cost_usd: float
+    processing_time_ms: float
+    has_animations: bool
+    success: bool
+
+
+@dataclass
+class _MinuteBucket:
+    """Rolling per-minute aggregates for requests and AI generations."""
+
+    minute: int = -1
+    count: int = 0
+    errors: int = 0
+    sum_ms: float = 0.0
+    sum_sq_ms: float = 0.0
+    ai_count: int = 0
+    ai_success: int = 0
+    ai_tokens: int = 0
+    ai_cost_usd: float = 0.0
+    ai_sum_ms: float = 0.0
+    hist: list = field(default_factory=lambda: [0] * _HIST_SLOTS)
+
+    def reset(self, minute: int):
+        self.minute = minute
+        self.count = 0
+        self.errors = 0
+        self.sum_ms = 0.0
+        self.sum_sq_ms = 0.0
+        self.ai_count = 0
+        self.ai_success = 0
+        self.ai_tokens = 0
+        self.ai_cost_usd = 0.0
+        self.ai_sum_ms = 0.0
+        self.hist = [0] * _HIST_SLOTS
+
+
+class MetricsCollector:
+    """Collects request and AI-generation metrics in process memory."""
+
+    def __init__(self):
+        self._errors = deque(maxlen=100)
+        # Raw event history is bounded: aggregates live in the bucket
+        # ring, so this only needs to retain a recent-events tail rather
+        # than grow with total traffic until restart.
+        self._metrics = {"ai_generations": deque(maxlen=5000)}
+        self._counters: Counter = Counter()
+        # AI generation events are enqueued and flushed in batches by a
+        # background task so the request hot path never blocks on metrics
+        # bookkeeping; on overflow the oldest event is dropped.
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+        self._flush_task: asyncio.Task | None = None
+        # Ring of per-minute aggregate buckets: recording is O(1) and a
+        # summary over N hours sums N*60 buckets instead of scanning every
+        # recorded event.
+        self._buckets = [_MinuteBucket() for _ in range(_BUCKET_RING_SIZE)]
+        # Scrape results are memoized briefly so /metrics and /health
+        # hitting in the same second share one bucket walk.
+        self._summary_cache: tuple | None = None  # (monotonic, hours, result)
+        self._health_cache: tuple | None = None  # (monotonic, result)
+
+    def _bucket_for(self, ts: float) -> _MinuteBucket:
+        """Return the (lazily reset) bucket for the given wall-clock time."""
+        minute = int(ts // 60)
+        bucket = self._buckets[minute % _BUCKET_RING_SIZE]
+        if bucket.minute != minute:
+            bucket.reset(minute)
+        return bucket
+
+    # -- recording -------------------------------------------------------
+
+    def record_request(self, endpoint, method, status_code, response_time_ms):
+        # No lock: recording happens on the event-loop thread, counter
+        # updates are single C-level calls, and the bucket increments are
+        # GIL-serialized attribute adds — a torn read only skews a metric,
+        # it can never corrupt the structures.
+        #
+        # Counter keys are ("kind", label) tuples; endpoints are route
+        # templates from the router (a small fixed set of already-shared
+        # strings), so keying stays O(routes) no matter what paths are
+        # probed. The flat "requests_/api/x" schema is rebuilt only at
+        # scrape time.
+        self._counters.update((("requests", endpoint), ("status", status_code)))
+        bucket = self._bucket_for(time.time())
+        bucket.count += 1
+        bucket.sum_ms += response_time_ms
+        bucket.sum_sq_ms += response_time_ms * response_time_ms
+        bucket.hist[min(_HIST_SLOTS - 1, int(response_time_ms).bit_length())] += 1
+        if status_code >= 500:
+            bucket.errors += 1
+            self._errors.append(_ErrorEvent(time.time(), endpoint, status_code))
+
+    def record_ai_retry(self, reason: str):
+        """Count outbound AI request retries by reason (e.g. status code)."""
+        self._counters.update((("ai_retries", reason),))
+
+    def record_ai_generation(
+        self, framework, tokens_used, cost_usd, processing_time_ms, has_animations, success
+    ):
+        """Queue an AI generation event; never blocks the caller."""
+        # Events are NamedTuples with plain epoch floats: a C-level tuple
+        # allocation instead of a dict plus a datetime object, roughly a
+        # third of the memory per entry; ISO rendering happens only at
+        # serialization time.
+        event = _AIEvent(
+            time.time(),
+            framework,
+            tokens_used,
+            cost_usd,
+            processing_time_ms,
+            has_animations,
+            success,
+        )
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            try:
+                self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            try:
+                self._queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    # -- background flushing ---------------------------------------------
+
+    def start(self):
+        """Start the background flush task (called from the app lifespan)."""
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._drain()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(1.0)
+            self._drain()
+
+    def _drain(self, limit: int = 256):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        if batch:
+            self._metrics["ai_generations"].extend(batch)
+            for event in batch:
+                bucket = self._bucket_for(event.ts)
+                bucket.ai_count += 1
+                bucket.ai_success += 1 if event.success else 0
+                bucket.ai_tokens += event.tokens_used
+                bucket.ai_cost_usd += event.cost_usd
+                bucket.ai_sum_ms += event.processing_time_ms
+
+    # -- reading ---------------------------------------------------------
+
+    @staticmethod
+    def _percentile(hist, pct):
+        """Estimate a percentile from a merged power-of-two histogram.
+
+        Returns the upper bound of the slot holding the target rank, i.e.
+        the true value rounded up to the next power of two milliseconds.
+        """
+        total = sum(hist)
+        if not total:
+            return 0.0
+        target = total * pct / 100
+        seen = 0
+        for slot, count in enumerate(hist):
+            seen += count
+            if seen >= target:
+                return float(1 << slot) if slot else 0.0
+        return float(1 << (_HIST_SLOTS - 1))
+
+    def _window_totals(self, minutes: int):
+        """Sum the last ``minutes`` minute-buckets."""
+        now_minute = int(time.time() // 60)
+        totals = _MinuteBucket(minute=now_minute)
+        for offset in range(min(minutes, _BUCKET_RING_SIZE)):
+            minute = now_minute - offset
+            bucket = self._buckets[minute % _BUCKET_RING_SIZE]
+            if bucket.minute != minute:
+                continue  # slot holds stale (or no) data for this minute
+            totals.count += bucket.count
+            totals.errors += bucket.errors
+            totals.sum_ms += bucket.sum_ms
+            totals.sum_sq_ms += bucket.sum_sq_ms
+            totals.ai_count += bucket.ai_count
+            totals.ai_success += bucket.ai_success
+            totals.ai_tokens += bucket.ai_tokens
+            totals.ai_cost_usd += bucket.ai_cost_usd
+            totals.ai_sum_ms += bucket.ai_sum_ms
+            for slot, count in enumerate(bucket.hist):
+                totals.hist[slot] += count
+        return totals
+
+    def get_summary(self, hours: int = 1):
+        """Aggregate request/AI metrics over the last ``hours`` hours.
+
+        Totals and percentiles both come from the per-minute bucket ring,
+        so the cost is O(minutes in window) regardless of traffic volume;
+        results are reused for one second across concurrent scrapers.
+        """
+        cached = self._summary_cache
+        if cached is not None:
+            ts, cached_hours, result = cached
+            if hours == cached_hours and time.monotonic() - ts < 1.0:
+                return result
+        self._drain()
+        cutoff = time.time() - hours * 3600
+        totals = self._window_totals(hours * 60)
+        errors = [e for e in self._errors if e.ts > cutoff]
+        result = {
+            "window_hours": hours,
+            "requests": {
+                "total": totals.count,
+                "avg_response_time_ms": (
+                    totals.sum_ms / totals.count if totals.count else 0.0
+                ),
+                "p50_ms": self._percentile(totals.hist, 50),
+                "p95_ms": self._percentile(totals.hist, 95),
+                "p99_ms": self._percentile(totals.hist, 99),
+            },
+            "ai_generations": {
+                "total": totals.ai_count,
+                "successful": totals.ai_success,
+                "tokens_used": totals.ai_tokens,
+                "cost_usd": round(totals.ai_cost_usd, 4),
+                "avg_processing_time_ms": (
+                    totals.ai_sum_ms / totals.ai_count if totals.ai_count else 0.0
+                ),
+            },
+            "errors": {
+                "total": totals.errors,
+                "recent": [
+                    {
+                        "endpoint": e.endpoint,
+                        "status_code": e.status_code,
+                        "timestamp": datetime.fromtimestamp(e.ts).isoformat(),
+                    }
+                    for e in errors[-10:]
+                ],
+            },
+            "counters": {
+                f"{kind}_{label}": value
+                for (kind, label), value in self._counters.items()
+            },
+        }
+        self._summary_cache = (time.monotonic(), hours, result)
+        return result
+
+    @staticmethod
+    def _escape_label(value: str) -> str:
+        """Escape a label value per the Prometheus text-format spec.
+
+        Backslash, double quote and newline are the three characters the
+        exposition format requires escaping; an unescaped one in any label
+        poisons the whole scrape, not just its own line.
+        """
+        return (
+            value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+
+    def render_prometheus(self) -> str:
+        """Render the collected metrics in Prometheus text exposition format.
+
+        Counters are cumulative since process start; the latency histogram
+        covers the 24h bucket ring (older samples have expired).
+        """
+        self._drain()
+        lines = [
+            "# TYPE http_requests_total counter",
+        ]
+        for (kind, label), value in self._counters.items():
+            if kind == "requests":
+                lines.append(
+                    f'http_requests_total{{endpoint="{self._escape_label(label)}"}} {value}'
+                )
+        lines.append("# TYPE http_responses_total counter")
+        for (kind, label), value in self._counters.items():
+            if kind == "status":
+                lines.append(f'http_responses_total{{status="{label}"}} {value}')
+
+        totals = self._window_totals(_BUCKET_RING_SIZE)
+        lines.append("# TYPE http_request_duration_ms histogram")
+        cumulative = 0
+        for slot, count in enumerate(totals.hist):
+            cumulative += count
+            bound = (1 << slot) if slot else 0
+            lines.append(f'http_request_duration_ms_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_ms_bucket{{le="+Inf"}} {totals.count}')
+        lines.append(f"http_request_duration_ms_sum {totals.sum_ms}")
+        lines.append(f"http_request_duration_ms_count {totals.count}")
+
+        lines.append("# TYPE ai_generations_total counter")
+        lines.append(f"ai_generations_total {totals.ai_count}")
+        lines.append("# TYPE ai_tokens_total counter")
+        lines.append(f"ai_tokens_total {totals.ai_tokens}")
+        lines.append("")
+        return "\n".join(lines)
+
+    def get_health_status(self):
+        """Quick health signal derived from the last five minutes."""
+        cached = self._health_cache
+        if cached is not None and time.monotonic() - cached[0] < 1.0:
+            return cached[1]
+        totals = self._window_totals(5)
+        error_rate = totals.errors / totals.count if totals.count else 0.0
+        result = {
+            "status": "degraded" if error_rate > 0.1 else "healthy",
+            "requests_5m": totals.count,
+            "errors_5m": totals.errors,
+            "error_rate_5m": round(error_rate, 4),
+        }
+        self._health_cache = (time.monotonic(), result)
+        return result
+
+
+metrics_collector = MetricsCollector()
+
+# Probe endpoints are exempt from instrumentation and rate limiting.
+# frozenset membership is a single O(1) hash lookup per request, and
+# str.startswith takes the prefix tuple in one C call.
+_SKIP_PATHS = frozenset({"/health", "/api/status", "/metrics"})
+_SKIP_PREFIXES = ("/health/",)
+
+
+class MetricsMiddleware:
+    """Record per-request timing and status into the collector.
+
+    Implemented as a raw ASGI callable rather than BaseHTTPMiddleware:
+    that base class spawns an anyio task group and re-wraps the response
+    through a memory stream on every request, and exempt probe paths here
+    skip the middleware frame entirely.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if path in _SKIP_PATHS or path.startswith(_SKIP_PREFIXES):
+            return await self.app(scope, receive, send)
+
+        # perf_counter_ns: monotonic (immune to NTP steps) and an int, so
+        # no float arithmetic happens until the duration is reported
+        start_ns = time.perf_counter_ns()
+        method = scope["method"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response_time_ms = (time.perf_counter_ns() - start_ns) / 1_000_000
+                # Label with the matched route template, not the raw path:
+                # routing has run by the time the response starts, and the
+                # template set is fixed, so scanners probing arbitrary
+                # paths all land in one "unmatched" series instead of
+                # minting a counter key per probed URL.
+                route = scope.get("route")
+                endpoint = getattr(route, "path", None) or "unmatched"
+                metrics_collector.record_request(
+                    endpoint, method, message["status"], response_time_ms
+                )
+                message.setdefault("headers", []).append(
+                    (b"x-process-time", str(response_time_ms).encode("latin-1"))
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RateLimiter:
+    """Per-client token bucket with bounded, LRU-evicted state.
+
+    Each client maps to a ``(tokens, last_refill)`` tuple refilled on
+    access from monotonic time, so checks are O(1), immune to wall-clock
+    jumps, and — unlike the old fixed-window dict that was never evicted —
+    total memory is capped by ``max_clients``.
+    """
+
+    def __init__(self, requests: int = 100, window: int = 60, max_clients: int = 100_000):
+        self.capacity = float(requests)
+        self.rate = requests / window  # tokens per second
+        self.max_clients = max_clients
+        self.clients: OrderedDict = OrderedDict()
+
+    def is_allowed(self, client_id: str) -> bool:
+        now = time.monotonic()
+        entry = self.clients.get(client_id)
+        if entry is None:
+            tokens = self.capacity
+        else:
+            tokens, last = entry
+            tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1.0
+        self.clients[client_id] = (tokens - 1.0 if allowed else tokens, now)
+        self.clients.move_to_end(client_id)
+        while len(self.clients) > self.max_clients:
+            self.clients.popitem(last=False)
+        return allowed
+
+
+rate_limiter = RateLimiter(settings.rate_limit_requests, settings.rate_limit_window)
+
+
+class RateLimitMiddleware:
+    """Reject over-limit clients before the request reaches the router.
+
+    Pure ASGI for the same reason as MetricsMiddleware: no
+    BaseHTTPMiddleware task group or response re-wrap, and the client
+    address comes straight from the scope without building a Request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if path in _SKIP_PATHS or path.startswith(_SKIP_PREFIXES):
+            return await self.app(scope, receive, send)
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        if not rate_limiter.is_allowed(client_ip):
+            response = JSONResponse(
+                status_code=429,
+                content={"success": False, "detail": "Too many requests"},
+            )
+            return await response(scope, receive, send)
+        await self.app(scope, receive, send)
@@ -0,0 +1,767 @@
+"""Azure OpenAI service used by the sketch-to-code and chat endpoints."""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import io
+import logging
+import random
+import re
+import time
+from collections import Counter, OrderedDict
+
+import httpx
+import orjson
+from fastapi import HTTPException
+from PIL import Image
+from pydantic import BaseModel, ConfigDict
+
+from app.core.config import settings
+from app.monitoring.metrics import metrics_collector
+
+logger = logging.getLogger(__name__)
+
+# Static prompt fragments are built once at import time; per-request code
+# only formats the user portion into the template.
+SYSTEM_PROMPT = """You are an expert Vue 3 frontend developer.
+You convert hand-drawn UI sketches into production-quality Vue single-file
+components using <script setup>, Tailwind CSS utility classes and semantic
+HTML. Return ONLY the component code, without markdown fences or commentary.
+Infer sensible colors, spacing and copy from the sketch. Prefer accessible
+markup (labels, alt text, button elements) and add subtle transitions where
+they improve the experience."""
+
+# Folded into cache keys so edits to the prompt invalidate cached results
+SYSTEM_PROMPT_VERSION = hashlib.sha1(SYSTEM_PROMPT.encode()).hexdigest()[:8]
+
+DETAILED_PROMPT_TEMPLATE = (
+    "{user_prompt}\n\n"
+    "ANALYSIS REQUIREMENTS:\n"
+    "- Identify every distinct UI element in the sketch\n"
+    "- Reproduce the layout with Tailwind flex/grid utilities\n"
+    "- Wire up obvious interactivity (buttons, forms, links)\n"
+    "- Keep the component self-contained and ready to render"
+)
+
+CHAT_SYSTEM_PROMPT = (
+    "You are a helpful Vue 3 and Tailwind CSS assistant for the Canvas "
+    "Smith app. Answer concisely and include code snippets when useful."
+)
+
+_BASE_GEN_PARAMS = {
+    "top_p": 0.95,
+    "frequency_penalty": 0.0,
+    "presence_penalty": 0.0,
+}
+
+# All analysis features are tallied in one pass over the generated code
+# instead of a dozen separate .count() scans. More specific alternatives
+# come first so e.g. "@click" is never half-consumed by a shorter match.
+_ANALYZE_RE = re.compile(
+    r"(?P<click>@click)"
+    r"|(?P<submit>@submit)"
+    r"|(?P<keyframes>@keyframes)"
+    r"|(?P<vmodel>v-model)"
+    r"|(?P<router>router-link)"
+    r"|(?P<href>href)"
+    r"|(?P<trans_tag><transition)"
+    r"|(?P<trans_cls>transition-)"
+    r"|(?P<anim>animation:)"
+    r"|(?P<hover_tw>hover:)"
+    r"|(?P<hover_css>:hover)"
+    r"|(?P<button>button)"
+    r"|(?P<form>form)"
+    r"|(?P<input>input)",
+    re.IGNORECASE,
+)
+_TAILWIND_RE = re.compile(r"\b(?:bg-|text-|p-|m-|flex|grid)", re.IGNORECASE)
+
+
+def _perceptual_hash(image_data: bytes) -> int:
+    """64-bit difference hash of the sketch.
+
+    Near-identical sketches (re-uploads, trivial re-exports) land within a
+    few bits of each other, which is enough to reuse a cached generation.
+    """
+    with Image.open(io.BytesIO(image_data)) as img:
+        gray = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+# Placeholder spliced out of the serialized payload skeleton; the base64
+# alphabet is JSON-safe, so raw encoded bytes can be substituted directly.
+_B64_SENTINEL = b"__CANVAS_SMITH_B64__"
+
+
+def _build_payload_bytes(
+    detailed_prompt: str,
+    image_data: bytes,
+    image_format: str,
+    max_tokens: int,
+    stream: bool = False,
+) -> bytes:
+    """Serialize the vision payload straight to request-body bytes.
+
+    The JSON skeleton is dumped with orjson around a sentinel, then the
+    base64 image is spliced in as bytes — the encoded image is never
+    materialized as a Python str and never re-serialized by the JSON
+    encoder, roughly halving peak memory for large sketches. Encoding a
+    multi-MB sketch still takes tens of milliseconds, so callers run this
+    (and the perceptual hash) in a worker thread.
+    """
+    payload = {
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": detailed_prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": _B64_SENTINEL.decode("ascii")},
+                    },
+                ],
+            },
+        ],
+        "max_completion_tokens": max_tokens,
+        **_BASE_GEN_PARAMS,
+    }
+    if stream:
+        payload["stream"] = True
+        # Azure emits a final usage-only event so token accounting survives
+        # streaming
+        payload["stream_options"] = {"include_usage": True}
+    skeleton = orjson.dumps(payload)
+    data_url = (
+        b"data:image/" + image_format.encode("ascii") + b";base64,"
+        + base64.b64encode(image_data)
+    )
+    # Splice only the image_url slot. The prompt text is user-controlled
+    # and serializes ahead of the image entry, so the placeholder is
+    # always the last occurrence — a plain replace() would also expand a
+    # sentinel typed into the instructions, duplicating the image into
+    # the prompt.
+    head, _, tail = skeleton.rpartition(_B64_SENTINEL)
+    return head + data_url + tail
+
+
+# Typed view of the Azure chat-completions response. pydantic-core parses
+# the raw bytes in one rust-side pass, replacing the nested .get() chains
+# and defaulting that each caller previously repeated.
+class AzureMessage(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    content: str | None = None
+
+
+class AzureChoice(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    message: AzureMessage = AzureMessage()
+    finish_reason: str | None = None
+
+
+class AzureUsage(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+
+
+class AzureChatCompletion(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    choices: list[AzureChoice] = []
+    usage: AzureUsage = AzureUsage()
+
+    @property
+    def first_content(self) -> str:
+        """Content of the first choice, or ``""`` when absent."""
+        return (self.choices[0].message.content or "") if self.choices else ""
+
+
+class AIResponseCache:
+    """Two-tier TTL/LRU cache for generation results.
+
+    Tier 1 is an exact lookup keyed on a digest of the image bytes and
+    prompt. Tier 2 is perceptual: a hit requires the same prompt and a
+    difference-hash within ``hamming_threshold`` bits, catching the "same
+    sketch, slightly different bytes" case without an Azure round-trip.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600.0, hamming_threshold: int = 6):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hamming_threshold = hamming_threshold
+        # exact_key -> (ts, phash, prompt_key, result)
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, exact_key: str, phash: int, prompt_key: str):
+        now = time.monotonic()
+        entry = self._entries.get(exact_key)
+        if entry is not None:
+            if now - entry[0] < self.ttl:
+                self._entries.move_to_end(exact_key)
+                return entry[3], "exact"
+            del self._entries[exact_key]
+        for key, (ts, cached_phash, cached_prompt, result) in self._entries.items():
+            if now - ts >= self.ttl or cached_prompt != prompt_key:
+                continue
+            if (phash ^ cached_phash).bit_count() <= self.hamming_threshold:
+                self._entries.move_to_end(key)
+                return result, "perceptual"
+        return None, None
+
+    def set(self, exact_key: str, phash: int, prompt_key: str, result: dict):
+        self._entries[exact_key] = (time.monotonic(), phash, prompt_key, result)
+        self._entries.move_to_end(exact_key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class _AsyncTokenBucket:
+    """Minimal async token bucket used to pace outbound Azure calls.
+
+    Refills continuously at ``capacity / per`` tokens per second; acquire()
+    sleeps until a token is available instead of letting bursts race into
+    Azure's rate limiter.
+    """
+
+    def __init__(self, capacity: float, per: float):
+        self.capacity = capacity
+        self.per = per
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0):
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated) * (self.capacity / self.per),
+                )
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) * self.per / self.capacity
+            await asyncio.sleep(wait)
+
+
+class AIService:
+    """Thin client around the Azure OpenAI chat completions API."""
+
+    def __init__(self):
+        self.api_key = settings.azure_openai_api_key
+        self.endpoint = settings.azure_openai_endpoint
+        self.deployment_name = settings.azure_openai_deployment
+        self.api_version = settings.azure_openai_api_version
+        self.max_tokens = settings.azure_openai_max_tokens
+        self.timeout = settings.azure_openai_timeout
+        self.max_retries = settings.azure_openai_max_retries
+        self._gzip_requests = settings.azure_openai_gzip_requests
+        self.refresh_headers()
+        self._client: httpx.AsyncClient | None = None
+        self._response_cache = AIResponseCache()
+        # exact cache key -> future for a generation currently in flight
+        self._inflight: dict = {}
+        # Cap concurrent in-flight Azure calls to the deployment's quota
+        # and pace them to its requests-per-minute budget.
+        self._max_concurrency = settings.azure_openai_max_concurrency
+        self._sem = asyncio.Semaphore(self._max_concurrency)
+        self._rpm = _AsyncTokenBucket(settings.azure_openai_rpm, 60.0)
+        # The endpoint URL only depends on startup configuration, so build
+        # it once instead of re-assembling it on every request/probe.
+        base = self.endpoint.rstrip("/")
+        self._chat_endpoint = (
+            f"{base}/openai/deployments/{self.deployment_name}"
+            f"/chat/completions?api-version={self.api_version}"
+        )
+        # Deployment-metadata probe used by health_check — returns 200
+        # without invoking the model, so probes cost no tokens.
+        self._probe_endpoint = (
+            f"{base}/openai/deployments/{self.deployment_name}"
+            f"?api-version={self.api_version}"
+        )
+        # (monotonic ts, result) of the last probe; see health_check
+        self._health_probe_cache: tuple | None = None
+        # Configuration is immutable after startup; snapshot the derived
+        # status once so probe endpoints only do attribute reads.
+        self._endpoints_configured = bool(
+            self.api_key and self.endpoint and self.deployment_name
+        )
+        self._config_snapshot = {
+            "api_key_configured": bool(self.api_key),
+            "endpoint_configured": bool(self.endpoint),
+            "deployment_configured": bool(self.deployment_name),
+            "api_version": self.api_version,
+            "chat_endpoint": self._chat_endpoint if self.endpoint else None,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use.
+
+        One pooled HTTP/2 client is reused for every Azure call so concurrent
+        requests multiplex over kept-alive connections instead of paying a
+        TCP + TLS handshake each time.
+        """
+        if self._client is None or self._client.is_closed:
+            # Pool width tracks the concurrency semaphore (plus headroom
+            # for health probes): more sockets than that can never be in
+            # flight, and a 75s keepalive holds the warm TLS connections
+            # to Azure across request gaps instead of re-handshaking —
+            # kept-alive sockets also skip repeat DNS resolution.
+            self._client = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(
+                    max_connections=self._max_concurrency + 4,
+                    max_keepalive_connections=self._max_concurrency,
+                    keepalive_expiry=75.0,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled HTTP client (called on app shutdown)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    def is_configured(self) -> bool:
+        return self._endpoints_configured
+
+    @property
+    def inflight_requests(self) -> int:
+        """Gauge: Azure calls currently holding the concurrency semaphore."""
+        return self._max_concurrency - self._sem._value
+
+    def refresh_headers(self):
+        """(Re)build the cached request headers, e.g. after key rotation."""
+        api_key = (
+            self.api_key.get_secret_value()
+            if hasattr(self.api_key, "get_secret_value")
+            else str(self.api_key)
+        )
+        self._headers = {
+            "api-key": api_key,
+            "Content-Type": "application/json",
+            "User-Agent": f"{settings.app_name}/{settings.version}",
+        }
+        self._gzip_headers = {**self._headers, "Content-Encoding": "gzip"}
+
+    def _get_headers(self):
+        # Headers only change on key rotation (refresh_headers), so every
+        # request — including load-balancer health probes — reuses the
+        # same dict instead of rebuilding it.
+        return self._headers
+
+    def _get_chat_endpoint(self):
+        return self._chat_endpoint
+
+    async def _prepare_request(self, body: bytes):
+        """Return ``(body, headers)``, gzipping the body when enabled.
+
+        httpx negotiates compressed responses on its own; this covers the
+        upload side, where the base64 image compresses 25-30% even at
+        compresslevel=1. Compression runs in a worker thread since a
+        multi-MB body takes tens of milliseconds.
+        """
+        if self._gzip_requests:
+            body = await asyncio.to_thread(gzip.compress, body, 1)
+            return body, self._gzip_headers
+        return body, self._headers
+
+    async def _make_ai_request(self, body: bytes) -> AzureChatCompletion:
+        """POST a serialized chat-completions body to Azure with basic retry handling."""
+        if not self.is_configured():
+            raise HTTPException(status_code=503, detail="AI service is not configured")
+
+        client = self._get_client()
+        body, headers = await self._prepare_request(body)
+        for attempt in range(self.max_retries):
+            # Only transport-level failures (timeouts, dropped connections)
+            # are retried; HTTP error responses from Azure are classified
+            # below and propagate immediately instead of multiplying
+            # latency on hard failures.
+            try:
+                async with self._sem:
+                    await self._rpm.acquire()
+                    response = await client.post(
+                        self._get_chat_endpoint(),
+                        content=body,
+                        headers=headers,
+                    )
+            except httpx.TimeoutException:
+                logger.warning("Azure OpenAI request timed out (attempt %d)", attempt + 1)
+            except httpx.TransportError as e:
+                logger.warning(
+                    "Connection error calling Azure OpenAI (attempt %d): %s",
+                    attempt + 1,
+                    e,
+                )
+            else:
+                if response.status_code == 200:
+                    return AzureChatCompletion.model_validate_json(response.content)
+                if response.status_code in (429, 503, 504):
+                    # Honor the server's own pacing hint when present —
+                    # plain exponential backoff retries too early on a
+                    # throttled deployment and wastes the first attempts.
+                    try:
+                        retry_after = float(
+                            response.headers.get("retry-after")
+                            or response.headers.get("x-ratelimit-reset-requests")
+                            or 0
+                        )
+                    except ValueError:
+                        retry_after = 0.0
+                    wait_time = max(retry_after, min(30, 2**attempt))
+                    metrics_collector.record_ai_retry(str(response.status_code))
+                    logger.warning(
+                        "Azure OpenAI returned %s, retrying in %.1fs",
+                        response.status_code,
+                        wait_time,
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
+                # Azure error bodies can be multi-KB JSON (content filter
+                # verdicts); keep a 512-byte snippet rather than decoding
+                # and copying the whole thing into the log and exception.
+                snippet = response.content[:512].decode("utf-8", "replace")
+                logger.error("AI API error: %s - %s", response.status_code, snippet)
+                raise HTTPException(status_code=response.status_code, detail=snippet)
+
+            if attempt == self.max_retries - 1:
+                break
+            # Jittered exponential backoff so retries from concurrent
+            # requests don't reconnect in lockstep
+            await asyncio.sleep(min(30, 2**attempt) * (0.5 + random.random()))
+
+        raise HTTPException(status_code=502, detail="AI service request failed")
+
+    async def generate_code_from_image(
+        self, image_data, image_format: str = "png", additional_instructions: str = ""
+    ):
+        """Turn a preprocessed sketch into a Vue single-file component."""
+        if not settings.ai_cache_enabled:
+            return await self._generate_uncached(
+                image_data, image_format, additional_instructions
+            )
+
+        phash = await asyncio.to_thread(_perceptual_hash, image_data)
+        exact_key = hashlib.sha256(
+            image_data
+            + additional_instructions.encode("utf-8")
+            + SYSTEM_PROMPT_VERSION.encode("ascii")
+        ).hexdigest()
+        cached, hit_kind = self._response_cache.get(
+            exact_key, phash, additional_instructions
+        )
+        if cached is not None:
+            logger.info("AI response cache hit (%s)", hit_kind)
+            return {**cached, "metadata": {**cached["metadata"], "cache": hit_kind}}
+
+        # Coalesce concurrent identical uploads: callers arriving while an
+        # equivalent generation is in flight await its future instead of
+        # firing a second Azure call.
+        existing = self._inflight.get(exact_key)
+        if existing is not None:
+            logger.info("Joining in-flight generation for an identical sketch")
+            return await existing
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[exact_key] = future
+        try:
+            result = await self._generate_uncached(
+                image_data, image_format, additional_instructions
+            )
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # joiners re-raise on await; mark retrieved here
+            raise
+        else:
+            future.set_result(result)
+            if result["generated_code"]:
+                self._response_cache.set(
+                    exact_key, phash, additional_instructions, result
+                )
+            return result
+        finally:
+            self._inflight.pop(exact_key, None)
+            # If the winner was cancelled (client disconnect, shutdown),
+            # the except clause above never ran — cancel the shared future
+            # so joiners fail fast and can retry instead of awaiting a
+            # future nothing will ever resolve.
+            if not future.done():
+                future.cancel()
+
+    @staticmethod
+    def _detailed_prompt(additional_instructions: str) -> str:
+        user_prompt = "Convert this UI sketch into a complete Vue 3 component."
+        if additional_instructions:
+            user_prompt = f"{user_prompt}\n\nAdditional instructions: {additional_instructions}"
+        return DETAILED_PROMPT_TEMPLATE.format(user_prompt=user_prompt)
+
+    async def stream_code_from_image(
+        self, image_data, image_format: str = "png", additional_instructions: str = ""
+    ):
+        """Stream a generation as it is produced, one event dict at a time.
+
+        Yields ``{"type": "delta", "content": ...}`` for each completion
+        chunk as Azure emits it, then a single ``{"type": "done", ...}``
+        event carrying the assembled code, token usage and the same
+        metadata the buffered path returns. Time-to-first-byte becomes
+        first-token latency instead of full-completion latency, and peak
+        memory is one SSE chunk rather than the whole response.
+
+        Streaming responses bypass the response cache and the in-flight
+        dedup map (a half-consumed stream is not reusable), and transport
+        errors are not retried — a retry mid-stream would replay content
+        the client already rendered.
+        """
+        if not self.is_configured():
+            raise HTTPException(status_code=503, detail="AI service is not configured")
+
+        detailed_prompt = self._detailed_prompt(additional_instructions)
+        body = await asyncio.to_thread(
+            _build_payload_bytes,
+            detailed_prompt,
+            image_data,
+            image_format,
+            self.max_tokens,
+            True,
+        )
+
+        client = self._get_client()
+        body, headers = await self._prepare_request(body)
+        parts: list = []
+        usage: dict = {}
+        async with self._sem:
+            await self._rpm.acquire()
+            async with client.stream(
+                "POST",
+                self._get_chat_endpoint(),
+                content=body,
+                headers=headers,
+            ) as response:
+                if response.status_code != 200:
+                    snippet = (await response.aread())[:512].decode("utf-8", "replace")
+                    logger.error(
+                        "AI API error: %s - %s", response.status_code, snippet
+                    )
+                    raise HTTPException(
+                        status_code=response.status_code, detail=snippet
+                    )
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+                    event = orjson.loads(data)
+                    if event.get("usage"):
+                        usage = event["usage"]
+                    choices = event.get("choices")
+                    if not choices:
+                        continue
+                    content = (choices[0].get("delta") or {}).get("content")
+                    if content:
+                        parts.append(content)
+                        yield {"type": "delta", "content": content}
+
+        generated_code = _strip_code_fences("".join(parts).strip())
+        analysis = self._analyze_generated_component(generated_code)
+        animations = analysis["animations"]
+        yield {
+            "type": "done",
+            "generated_code": generated_code,
+            "token_usage": {
+                "prompt_tokens": usage.get("prompt_tokens", 0),
+                "completion_tokens": usage.get("completion_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            "metadata": {
+                "model": self.deployment_name,
+                "image_format": image_format,
+                "image_size_bytes": len(image_data),
+                "component_prediction": analysis,
+                "has_animations": (
+                    animations["vue_transitions"] + animations["css_animations"] > 0
+                ),
+                "has_hover_effects": animations["hover_effects"] > 0,
+            },
+        }
+
+    async def _generate_uncached(
+        self, image_data, image_format: str, additional_instructions: str
+    ):
+        """Run one real generation round-trip (no cache or dedup layers)."""
+        detailed_prompt = self._detailed_prompt(additional_instructions)
+
+        body = await asyncio.to_thread(
+            _build_payload_bytes, detailed_prompt, image_data, image_format, self.max_tokens
+        )
+
+        completion = await self._make_ai_request(body)
+
+        generated_code = completion.first_content.strip()
+        if not generated_code:
+            # A compact summary instead of repr-ing the whole response —
+            # a vision completion can be tens of KB and this path can
+            # fire under load (content filter, truncation).
+            logger.warning(
+                "Empty completion content; finish_reason=%s choices=%d usage=%s",
+                completion.choices[0].finish_reason if completion.choices else None,
+                len(completion.choices),
+                completion.usage,
+            )
+        generated_code = _strip_code_fences(generated_code)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Generated code preview: %s", generated_code[:100])
+
+        usage = completion.usage
+        analysis = self._analyze_generated_component(generated_code)
+        # The regex tally already scanned the code once; derive the flags
+        # from its counts instead of re-walking the string per keyword.
+        animations = analysis["animations"]
+        has_animations = animations["vue_transitions"] + animations["css_animations"] > 0
+        has_hover_effects = animations["hover_effects"] > 0
+
+        result = {
+            "generated_code": generated_code,
+            "token_usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            },
+            "metadata": {
+                "model": self.deployment_name,
+                "image_format": image_format,
+                "image_size_bytes": len(image_data),
+                "component_prediction": analysis,
+                "has_animations": has_animations,
+                "has_hover_effects": has_hover_effects,
+                "generation_parameters": {
+                    "max_completion_tokens": self.max_tokens,
+                    "top_p": 0.95,
+                },
+            },
+        }
+        return result
+
+    async def chat_assistance(self, message: str, context=None, conversation_id=None):
+        """Answer a follow-up question about previously generated code."""
+        user_content = message
+        if context:
+            user_content = f"Context: {context}\n\nQuestion: {message}"
+
+        payload = {
+            "messages": [
+                {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+                {"role": "user", "content": user_content},
+            ],
+            "max_completion_tokens": self.max_tokens,
+        }
+
+        completion = await self._make_ai_request(orjson.dumps(payload))
+        usage = completion.usage
+
+        return {
+            "response": completion.first_content.strip(),
+            "conversation_id": conversation_id,
+            "token_usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+                "total_tokens": usage.total_tokens,
+            },
+            "metadata": {"model": self.deployment_name},
+        }
+
+    _HEALTH_TTL = 15.0  # seconds a probe result stays fresh
+
+    async def health_check(self):
+        """Probe the Azure OpenAI deployment, caching the result briefly.
+
+        The probe is a GET of the deployment metadata — it confirms the
+        endpoint, key and deployment without invoking the model, so it
+        costs no tokens. Results are cached for ``_HEALTH_TTL`` seconds:
+        liveness checks firing every few seconds across pods collapse to
+        one outbound call per TTL window instead of a paid completion each.
+        """
+        if not self.is_configured():
+            return {"status": "unconfigured", "response_time_ms": 0}
+
+        cached = self._health_probe_cache
+        start_time = time.perf_counter()
+        if cached is not None and start_time - cached[0] < self._HEALTH_TTL:
+            return cached[1]
+
+        try:
+            response = await self._get_client().get(
+                self._probe_endpoint, headers=self._headers
+            )
+            elapsed_ms = int((time.perf_counter() - start_time) * 1000)
+            if response.status_code == 200:
+                result = {
+                    "status": "healthy",
+                    "response_time_ms": elapsed_ms,
+                    "model": self.deployment_name,
+                }
+            else:
+                result = {
+                    "status": "unhealthy",
+                    "response_time_ms": elapsed_ms,
+                    "error": f"deployment probe returned {response.status_code}",
+                }
+        except Exception as e:
+            result = {
+                "status": "unhealthy",
+                "response_time_ms": int((time.perf_counter() - start_time) * 1000),
+                "error": str(e),
+            }
+        self._health_probe_cache = (time.perf_counter(), result)
+        return result
+
+    def _analyze_generated_component(self, code: str):
+        """Heuristic feature analysis of the generated component."""
+        tally = Counter(m.lastgroup for m in _ANALYZE_RE.finditer(code))
+        return {
+            "interactivity": {
+                "buttons": tally["button"],
+                "click_handlers": tally["click"],
+                "forms": tally["form"],
+                "submit_handlers": tally["submit"],
+                "inputs": tally["input"],
+                "v_models": tally["vmodel"],
+                "links": tally["router"] + tally["href"],
+            },
+            "animations": {
+                "vue_transitions": tally["trans_tag"] + tally["trans_cls"],
+                "css_animations": tally["keyframes"] + tally["anim"],
+                "hover_effects": tally["hover_tw"] + tally["hover_css"],
+            },
+            "uses_tailwind": _TAILWIND_RE.search(code) is not None,
+        }
+
+
+def _strip_code_fences(code: str) -> str:
+    """Remove a wrapping markdown code fence if the model added one."""
+    if code.startswith("```"):
+        first_newline = code.find("\n")
+        if first_newline != -1:
+            code = code[first_newline + 1 :]
+        if code.endswith("```"):
+            code = code[:-3]
+    return code.strip()
+
+
+# Shared service instance used by the API routes
+ai_service = AIService()
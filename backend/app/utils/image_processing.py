@@ -0,0 +1,238 @@
+"""Image preprocessing for the AI sketch-to-code pipeline."""
+
+import io
+import logging
+import struct
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageDraw, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Azure OpenAI vision works best with images at or below this edge length
+MAX_DIMENSION = 2048
+
+# Uploads already in one of these formats and within limits are forwarded
+# untouched instead of being decoded and re-encoded.
+_PASSTHROUGH_FORMATS = {"JPEG": "jpeg", "PNG": "png", "WEBP": "webp"}
+_PASSTHROUGH_MAX_BYTES = 4 * 1024 * 1024
+
+
+async def process_image_for_ai(source, content_type: str | None = None):
+    """Async wrapper around :func:`process_image_for_ai_sync`.
+
+    The Pillow work (decode, composite, resize, re-encode) is CPU-bound, so
+    it is pushed onto the threadpool instead of blocking the event loop.
+    """
+    return await run_in_threadpool(process_image_for_ai_sync, source, content_type)
+
+
+def process_image_for_ai_sync(source, content_type: str | None = None):
+    """Normalize an uploaded sketch for the Azure OpenAI vision API.
+
+    ``source`` may be a file object (e.g. the UploadFile's spooled temp
+    file, which Pillow decodes directly without an intermediate bytes
+    copy) or any bytes-like object. Returns a ``(png_bytes, image_format)``
+    tuple ready to be embedded in the request payload.
+    """
+    if content_type == "image/svg+xml":
+        if hasattr(source, "read"):
+            source.seek(0)
+            svg_bytes = source.read()
+        else:
+            svg_bytes = bytes(source)
+        return _rasterize_svg(svg_bytes)
+
+    try:
+        if hasattr(source, "read"):
+            source.seek(0)
+            stream = source
+        else:
+            stream = io.BytesIO(source)
+        with Image.open(stream) as img:
+            passthrough = _passthrough_bytes(img, stream)
+            if passthrough is not None:
+                return passthrough
+
+            if img.format == "JPEG" and max(img.size) > MAX_DIMENSION:
+                # libjpeg DCT scaling: decode oversized JPEGs directly at
+                # 1/2, 1/4 or 1/8 resolution in C instead of decoding the
+                # full bitmap and throwing most of it away in the resize.
+                img.draft("RGB", (MAX_DIMENSION, MAX_DIMENSION))
+
+            img = ImageOps.exif_transpose(img)
+
+            if img.has_transparency_data:
+                # Flatten transparency onto white in one C pass.
+                # alpha_composite reads the alpha channel in place, unlike
+                # paste(mask=img.split()[-1]) which first copies it out as
+                # a separate L image and then runs the general masked-paste
+                # path — roughly 3x the bytes moved. LA/palette-transparency
+                # inputs are promoted to RGBA first so they take the same
+                # flatten instead of a convert() that drops the alpha.
+                if img.mode != "RGBA":
+                    img = img.convert("RGBA")
+                background = Image.new("RGBA", img.size, (255, 255, 255, 255))
+                img = Image.alpha_composite(background, img).convert("RGB")
+            elif img.mode != "RGB":
+                img = img.convert("RGB")
+
+            if max(img.size) > MAX_DIMENSION:
+                # For big ratios, a box reduce() (integer adds, vectorized
+                # in C) takes the image most of the way down so the 8-tap
+                # LANCZOS kernel only runs on a near-target-size buffer
+                # instead of the full-resolution input.
+                ratio = max(img.size) / MAX_DIMENSION
+                if ratio > 4:
+                    img = img.reduce(int(ratio // 2))
+                img.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.Resampling.LANCZOS)
+
+            out = io.BytesIO()
+            # compress_level=1 instead of optimize=True: optimize runs
+            # extra zlib passes for a few percent smaller file, which the
+            # vision API doesn't care about; level 1 encodes several
+            # times faster.
+            img.save(out, format="PNG", compress_level=1)
+            return out.getvalue(), "png"
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to process image: {e}")
+        raise HTTPException(status_code=400, detail="Could not process the uploaded image")
+
+
+def _passthrough_bytes(img, stream):
+    """Return the original encoded bytes when no preprocessing is needed.
+
+    If the upload is already a JPEG/PNG/WebP within the dimension and size
+    limits (and carries no EXIF rotation), the full decode/re-encode cycle
+    is skipped and the bytes are forwarded to Azure as-is. Only the header
+    has been parsed at this point, so the check itself is nearly free.
+    """
+    image_format = _PASSTHROUGH_FORMATS.get(img.format)
+    if image_format is None:
+        return None
+    if img.width > MAX_DIMENSION or img.height > MAX_DIMENSION:
+        return None
+    # Transparency (alpha channel, tRNS chunk, palette transparency) must
+    # go through the flatten-onto-white pass: forwarded as-is, the vision
+    # API's compositing of the alpha is undefined and transparent-background
+    # exports can render as black-on-black. Mode comes from the parsed
+    # header, same as the EXIF check.
+    if img.has_transparency_data:
+        return None
+    # 0x0112 is the EXIF orientation tag; anything but 1 needs a transpose
+    if img.getexif().get(0x0112, 1) != 1:
+        return None
+
+    stream.seek(0, io.SEEK_END)
+    if stream.tell() > _PASSTHROUGH_MAX_BYTES:
+        stream.seek(0)
+        return None
+    stream.seek(0)
+    return stream.read(), image_format
+
+
+# Real SVG rasterization needs a native dependency; when cairosvg is
+# installed the model sees the actual sketch, otherwise we degrade to the
+# labelled placeholder rather than failing the upload.
+try:
+    import cairosvg
+except ImportError:  # pragma: no cover - optional dependency
+    cairosvg = None
+
+
+def _rasterize_svg(svg_bytes):
+    """Rasterize an SVG upload to PNG, or a placeholder without cairosvg."""
+    if cairosvg is not None:
+        try:
+            png_bytes = cairosvg.svg2png(
+                bytestring=svg_bytes, output_width=MAX_DIMENSION
+            )
+            return png_bytes, "png"
+        except Exception as e:
+            logger.error(f"Failed to rasterize SVG: {e}")
+            raise HTTPException(
+                status_code=400, detail="Could not process the uploaded image"
+            )
+    return _render_svg_placeholder()
+
+
+def _render_svg_placeholder():
+    """Rasterize a placeholder for SVG uploads.
+
+    Used when cairosvg is not installed, so the request still succeeds —
+    the model just sees a labelled canvas instead of the sketch.
+    """
+    img = Image.new("RGB", (800, 600), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    draw.text((20, 20), "SVG Image Detected", fill=(0, 0, 0))
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue(), "png"
+
+
+# IHDR color type -> closest PIL mode name, for the PNG fast path below
+_PNG_MODES = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}
+
+
+def _png_info(buf):
+    """Decode width/height/mode from the fixed-offset IHDR chunk."""
+    width, height = struct.unpack(">II", buf[16:24])
+    return {
+        "format": "PNG",
+        "width": width,
+        "height": height,
+        "mode": _PNG_MODES.get(buf[25], "RGB"),
+    }
+
+
+def _jpeg_info(buf):
+    """Scan JPEG markers for the SOFn frame header holding the dimensions."""
+    offset = 2
+    size = len(buf)
+    while offset + 9 < size:
+        if buf[offset] != 0xFF:
+            return None
+        marker = buf[offset + 1]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", buf[offset + 5 : offset + 9])
+            components = buf[offset + 9]
+            return {
+                "format": "JPEG",
+                "width": width,
+                "height": height,
+                "mode": "RGB" if components == 3 else "L" if components == 1 else "CMYK",
+            }
+        offset += 2 + struct.unpack(">H", buf[offset + 2 : offset + 4])[0]
+    return None
+
+
+def get_image_info(image_data):
+    """Return basic metadata (format, size, mode) for an uploaded image.
+
+    PNG and JPEG dimensions live in fixed-offset header fields, so those
+    formats are answered with a couple of struct.unpack calls instead of
+    building a full PIL image object; everything else falls back to
+    Pillow.
+    """
+    try:
+        if image_data[:8] == b"\x89PNG\r\n\x1a\n" and image_data[12:16] == b"IHDR":
+            return _png_info(image_data)
+        if image_data[:3] == b"\xff\xd8\xff":
+            info = _jpeg_info(image_data)
+            if info is not None:
+                return info
+        with Image.open(io.BytesIO(image_data)) as img:
+            return {
+                "format": img.format,
+                "width": img.width,
+                "height": img.height,
+                "mode": img.mode,
+            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to read image info: {e}")
+        raise HTTPException(status_code=400, detail="Could not read the uploaded image")
@@ -0,0 +1,104 @@
+"""Request validation helpers for the AI endpoints."""
+
+import logging
+import re
+
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upload limits (configurable via the environment, see app.core.config)
+MAX_IMAGE_SIZE = settings.max_image_size
+MAX_INSTRUCTIONS_LENGTH = settings.max_instructions_length
+CHUNK_SIZE = 64 * 1024
+
+# Compiled once at import: per-call re.sub/re.match still pays the pattern
+# cache lookup and flag handling on every request.
+#
+# One alternation, one pass, and no nested lazy quantifiers: the old
+# "<script.*?>.*?</script>" under DOTALL could pair every "<script" with
+# every ">" while backtracking — quadratic on adversarial input (ReDoS).
+# Possessive quantifiers ([^>]*+, \w++) never give characters back, so the
+# scan stays linear.
+_HARMFUL_RE = re.compile(
+    r"<script[^>]*+>.*?</script\s*+>"
+    r"|javascript:"
+    r"|on\w++\s*+=",
+    re.IGNORECASE | re.DOTALL,
+)
+_CONV_ID_RE = re.compile(r"^[a-f0-9-]{8,36}$")
+
+# Magic bytes for the supported raster formats. A prefix compare rejects
+# garbage uploads before they ever reach Pillow's plugin probing; SVG is
+# text and has no magic, so it is exempt.
+_MAGIC_PREFIXES = (
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF8",  # GIF
+    b"RIFF",  # WebP (RIFF container)
+    b"BM",  # BMP
+    b"II*\x00",  # TIFF, little-endian
+    b"MM\x00*",  # TIFF, big-endian
+)
+
+
+async def validate_image(image: UploadFile) -> int:
+    """Validate an uploaded sketch and return its size in bytes.
+
+    The upload is walked in fixed-size chunks purely to enforce the size
+    limit — the data itself stays in the UploadFile's SpooledTemporaryFile
+    (memory for small uploads, disk for large ones) and is never copied
+    into a second buffer here. The stream is rewound before returning so
+    Pillow can decode straight from the spool.
+    """
+    if image.content_type not in settings.allowed_image_types:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported image type: {image.content_type}",
+        )
+
+    size = 0
+    while chunk := await image.read(CHUNK_SIZE):
+        if size == 0 and image.content_type != "image/svg+xml":
+            if not chunk.startswith(_MAGIC_PREFIXES):
+                raise HTTPException(
+                    status_code=400,
+                    detail="Uploaded file is not a supported image",
+                )
+        size += len(chunk)
+        if size > MAX_IMAGE_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image too large (max {MAX_IMAGE_SIZE // (1024 * 1024)} MB)",
+            )
+
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Uploaded image is empty")
+
+    await image.seek(0)
+    return size
+
+
+def validate_instructions(instructions: str | None) -> str:
+    """Sanitize free-form user instructions before they reach the AI prompt."""
+    if not instructions:
+        return ""
+    if len(instructions) > MAX_INSTRUCTIONS_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Instructions too long (max {MAX_INSTRUCTIONS_LENGTH} characters)",
+        )
+
+    return _HARMFUL_RE.sub("", instructions.strip())
+
+
+def validate_conversation_id(conv_id: str | None) -> str | None:
+    """Check that a conversation id looks like a UUID-ish token."""
+    if conv_id is None:
+        return None
+    lowered = conv_id.lower()
+    if not _CONV_ID_RE.match(lowered):
+        raise HTTPException(status_code=400, detail="Invalid conversation id")
+    return lowered
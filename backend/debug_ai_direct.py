@@ -0,0 +1,75 @@
+"""Exercise AIService in-process, bypassing the HTTP layer.
+
+Run with the Azure OpenAI env vars set: ``python debug_ai_direct.py``.
+Calling ``generate_code_from_image`` directly separates service-level
+problems from route/upload handling; the generated component is written
+to ``direct_ai_test.vue`` for inspection.
+"""
+
+import asyncio
+import functools
+import io
+
+import orjson
+from PIL import Image, ImageDraw
+
+from app.services.ai_service import ai_service
+
+
+@functools.lru_cache(maxsize=1)
+def create_sketch_image() -> bytes:
+    """Return PNG bytes of a simple card sketch, encoded once per process."""
+    img = Image.new("RGB", (600, 400), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([100, 100, 500, 300], outline="black", width=3)
+    draw.text((270, 120), "Card", fill="black")
+    draw.rectangle([150, 220, 450, 260], outline="black", width=2)
+    draw.text((280, 230), "OK", fill="black")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def _write_component(code: str) -> None:
+    with open("direct_ai_test.vue", "w", encoding="utf-8") as f:
+        f.write(code)
+
+
+async def debug_ai_service_directly():
+    """Generate code from the sketch and dump every field of the result.
+
+    The raw PNG bytes go straight to the service, which base64-encodes
+    them exactly once while building the request body — before its retry
+    loop — so rate-limit retries reuse the same encoded payload.
+    """
+    image_data = create_sketch_image()
+    print(f"configured: {ai_service.is_configured()}")
+    print(f"sketch: {len(image_data)} bytes")
+
+    result = await ai_service.generate_code_from_image(image_data, "png")
+    code = result.get("generated_code", "")
+    print(f"generated_code length: {len(code)}")
+    print(f"token_usage: {result.get('token_usage')}")
+    # orjson's C serializer keeps this dump cheap even for large results
+    metadata = orjson.dumps(
+        result.get("metadata"), option=orjson.OPT_INDENT_2
+    ).decode()
+    print(f"metadata:\n{metadata}")
+
+    if code:
+        # Keep the blocking file write off the event loop, same as the
+        # service does for its CPU-bound steps.
+        await asyncio.to_thread(_write_component, code)
+        print("wrote direct_ai_test.vue")
+
+    await ai_service.aclose()
+
+
+if __name__ == "__main__":
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(debug_ai_service_directly())
@@ -0,0 +1,101 @@
+"""Manual debug harness for the running backend.
+
+Run the server (``python main.py``), then ``python debug_api.py`` to walk
+the public endpoints and print what came back. Useful when bisecting
+whether a problem lives in the route layer, the image pipeline or the
+Azure call.
+"""
+
+import asyncio
+import functools
+import io
+
+import httpx
+from PIL import Image, ImageDraw
+
+BASE_URL = "http://localhost:8000"
+DEFAULT_TIMEOUT = 120
+
+
+@functools.lru_cache(maxsize=1)
+def create_test_image() -> bytes:
+    """Draw the login-form sketch and return it as PNG bytes.
+
+    Pure and deterministic, so the PIL drawing and zlib encode run once
+    per process; repeat calls return the cached bytes.
+    """
+    img = Image.new("RGB", (800, 600), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([200, 150, 600, 450], outline="black", width=3)
+    draw.text((360, 180), "Login", fill="black")
+    draw.rectangle([250, 230, 550, 270], outline="black", width=2)
+    draw.text((260, 240), "email", fill="gray")
+    draw.rectangle([250, 300, 550, 340], outline="black", width=2)
+    draw.text((260, 310), "password", fill="gray")
+    draw.rectangle([250, 370, 550, 410], outline="black", width=2)
+    draw.text((370, 380), "Sign in", fill="black")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+async def test_endpoints_step_by_step():
+    """Probe the endpoints, running the independent GETs concurrently."""
+    async with httpx.AsyncClient(
+        http2=True, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT
+    ) as client:
+        # The three read-only probes don't depend on each other: fire them
+        # together over one multiplexed connection and wait for the slowest.
+        health, ai_health, frameworks = await asyncio.gather(
+            client.get("/health"),
+            client.get("/api/ai/health"),
+            client.get("/api/ai/supported-frameworks"),
+        )
+        print(f"1. /health -> {health.status_code}: {health.json()}")
+        print(f"2. /api/ai/health -> {ai_health.status_code}: {ai_health.json()}")
+        print(
+            f"3. /api/ai/supported-frameworks -> "
+            f"{frameworks.status_code}: {frameworks.json()}"
+        )
+
+        # The PNG is encoded once (cached); each post wraps a fresh
+        # BytesIO over the same bytes object — a cheap read-only view, no
+        # copy and no seek() bookkeeping between requests.
+        image_bytes = create_test_image()
+        print(f"   test image: {len(image_bytes)} bytes")
+
+        print("4. /api/ai/generate-code (no instructions)")
+        response = await client.post(
+            "/api/ai/generate-code",
+            files={"image": ("test.png", io.BytesIO(image_bytes), "image/png")},
+        )
+        print(f"   {response.status_code}")
+        if response.is_success:
+            body = response.json()
+            print(f"   generated {len(body.get('generated_code', ''))} chars, "
+                  f"tokens={body.get('token_usage')}")
+        else:
+            print(f"   {response.text[:500]}")
+
+        print("5. /api/ai/generate-code (with instructions)")
+        response = await client.post(
+            "/api/ai/generate-code",
+            files={"image": ("test.png", io.BytesIO(image_bytes), "image/png")},
+            data={"additional_instructions": "Use a dark theme"},
+        )
+        print(f"   {response.status_code}")
+        if response.is_success:
+            body = response.json()
+            print(f"   generated {len(body.get('generated_code', ''))} chars")
+        else:
+            print(f"   {response.text[:500]}")
+
+
+if __name__ == "__main__":
+    try:
+        import uvloop
+
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(test_endpoints_step_by_step())
@@ -0,0 +1,83 @@
+"""Reproduce and inspect the "empty generated_code" failure mode.
+
+Posts a minimal sketch to the running backend and dumps everything the
+response carries — token usage, analysis, timing — so an empty
+``generated_code`` can be traced to truncation, content filtering or a
+parsing problem rather than guessed at.
+"""
+
+import functools
+import io
+
+import httpx
+import orjson
+from PIL import Image, ImageDraw
+
+BASE_URL = "http://localhost:8000"
+DEFAULT_TIMEOUT = 120
+
+# One multiplexed HTTP/2 client shared by every call in the script: the
+# retry below reuses the warm connection instead of handshaking again.
+CLIENT = httpx.Client(http2=True, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT)
+
+
+@functools.lru_cache(maxsize=1)
+def create_simple_image() -> bytes:
+    """Return PNG bytes of the simplest sketch: one button.
+
+    Cached: the sketch never changes, so drawing + PNG encode happen once
+    per process even when the retry path rebuilds its buffer.
+    """
+    img = Image.new("RGB", (400, 300), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle([150, 130, 250, 170], outline="black", width=2)
+    draw.text((175, 142), "Click", fill="black")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def debug_ai_response():
+    """Post the sketch and print every field of the generation response."""
+    image_bytes = create_simple_image()
+    print(f"test image: {len(image_bytes)} bytes")
+    response = CLIENT.post(
+        "/api/ai/generate-code",
+        files={"image": ("simple.png", io.BytesIO(image_bytes), "image/png")},
+    )
+    print(f"status: {response.status_code}")
+    if not response.is_success:
+        print(response.text[:1000])
+        return
+
+    body = response.json()
+    code = body.get("generated_code", "")
+    print(f"success: {body.get('success')}")
+    print(f"generated_code length: {len(code)}")
+    print(f"token_usage: {body.get('token_usage')}")
+    # orjson (C extension) instead of json.dumps — the full-response dump
+    # is otherwise the slowest line here on big generations
+    analysis = orjson.dumps(
+        body.get("component_analysis"), option=orjson.OPT_INDENT_2
+    ).decode()
+    print(f"component_analysis:\n{analysis}")
+    print(f"processing_time_ms: {body.get('processing_time_ms')}")
+    if code:
+        print(f"first 200 chars:\n{code[:200]}")
+    else:
+        print("generated_code is EMPTY - check backend logs for "
+              "finish_reason/content-filter details")
+        # One retry on a warm connection: transient truncation sometimes
+        # clears on the second attempt. Fresh BytesIO over the same cached
+        # bytes — no re-encode, no copy.
+        retry = CLIENT.post(
+            "/api/ai/generate-code",
+            files={"image": ("simple.png", io.BytesIO(image_bytes), "image/png")},
+        )
+        if retry.is_success:
+            retry_code = retry.json().get("generated_code", "")
+            print(f"retry generated_code length: {len(retry_code)}")
+
+
+if __name__ == "__main__":
+    debug_ai_response()
@@ -1,16 +1,52 @@
+import mimetypes
 import os
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
+from functools import lru_cache
 
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
+from fastapi.responses import (
+    HTMLResponse,
+    ORJSONResponse,
+    PlainTextResponse,
+)
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from app.api.routes.ai import router as ai_router
+from app.core.config import settings
+from app.monitoring.metrics import (
+    MetricsMiddleware,
+    RateLimitMiddleware,
+    metrics_collector,
+)
+from app.services.ai_service import ai_service
 
 # Create FastAPI app
-SERVE_FRONTEND = os.getenv("SERVE_FRONTEND", "true").lower() in {"1", "true", "yes"}
-STATIC_DIR = os.getenv("STATIC_DIR", "static")
+SERVE_FRONTEND = settings.serve_frontend
+STATIC_DIR = settings.static_dir
+
+# Filesystem layout is fixed for the life of the container, so these
+# stats run once at startup; everything below (mounts, /api/info) reads
+# the flags instead of hitting the filesystem again.
+_STATIC_DIR_PRESENT = os.path.isdir(STATIC_DIR)
+_ASSETS_PATH = os.path.join(STATIC_DIR, "assets")
+_ASSETS_PRESENT = os.path.isdir(_ASSETS_PATH)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Flush queued metrics events in the background while the app runs
+    metrics_collector.start()
+    yield
+    await metrics_collector.stop()
+    # Release the pooled Azure OpenAI HTTP client on shutdown
+    await ai_service.aclose()
+
 
 app = FastAPI(
     title="Canvas Smith API",
@@ -18,116 +54,196 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS to allow frontend connections
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:5173",  # Vite dev server
-        "http://localhost:3000",  # Alternative dev server
-        "http://localhost:4173",  # Vite preview
-        "*",  # Allow all origins for development - restrict in production
-    ],
+    allow_origins=settings.get_cors_origins_list(),
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["*"],
     allow_headers=["*"],
 )
 
-
-# Response models
-class HealthResponse(BaseModel):
-    status: str
-    message: str
-    timestamp: str
-    version: str
-
-
-class StatusResponse(BaseModel):
-    backend_status: str
-    message: str
-    timestamp: str
-
-
-if SERVE_FRONTEND and os.path.isdir(STATIC_DIR):
+# Request metrics + per-client rate limiting (rate limiting outermost)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RateLimitMiddleware)
+
+# AI endpoints (sketch-to-code + chat)
+app.include_router(ai_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (text exposition format)."""
+    return PlainTextResponse(metrics_collector.render_prometheus())
+
+
+# Static payload templates, built once at import: these endpoints are
+# hammered by load balancers and liveness probes, and only the timestamp
+# changes between hits.
+_HEALTH_TEMPLATE = {
+    "status": "healthy",
+    "message": "Backend is healthy and running",
+    "version": settings.version,
+}
+_STATUS_TEMPLATE = {
+    "backend_status": "connected",
+    "message": "Backend is working and connected! \u2705",
+}
+_ROOT_FALLBACK_TEMPLATE = {
+    "status": "success",
+    "message": "Canvas Smith Backend is working (no built frontend found).",
+    "version": settings.version,
+}
+_INFO_TEMPLATE = {
+    "name": settings.app_name,
+    "version": settings.version,
+    "description": "Backend API for Canvas Smith application",
+    "serve_frontend": SERVE_FRONTEND,
+    "static_dir_present": _STATIC_DIR_PRESENT,
+    "endpoints": {
+        "root": "/",
+        "health": "/health",
+        "status": "/api/status",
+        "info": "/api/info",
+        "docs": "/docs",
+    },
+}
+
+
+@lru_cache(maxsize=1)
+def _timestamp_for_bucket(bucket: int) -> str:
+    return datetime.now().isoformat()
+
+
+def _cached_iso_timestamp() -> str:
+    """Current ISO timestamp, memoized in 200 ms buckets.
+
+    Probe endpoints only need a roughly-current timestamp; quantizing
+    monotonic time to 200 ms turns thousands of datetime.now().isoformat()
+    calls per second into at most five.
+    """
+    return _timestamp_for_bucket(int(time.monotonic() * 5))
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that prefers build-time ``.br``/``.gz`` asset variants.
+
+    When the Vite build emits ``main.js.br`` next to ``main.js`` and the
+    client accepts that encoding, the precompressed file is served as-is
+    with the original content type — no per-request compression CPU.
+    Falls back to the plain file otherwise.
+    """
+
+    async def get_response(self, path, scope):
+        accept = Headers(scope=scope).get("accept-encoding", "")
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            if encoding not in accept:
+                continue
+            try:
+                response = await super().get_response(path + suffix, scope)
+            except StarletteHTTPException:
+                continue
+            if response.status_code == 200:
+                media_type, _ = mimetypes.guess_type(path)
+                if media_type:
+                    response.headers["content-type"] = media_type
+                response.headers["content-encoding"] = encoding
+                response.headers["vary"] = "Accept-Encoding"
+                return response
+        return await super().get_response(path, scope)
+
+
+if SERVE_FRONTEND and _STATIC_DIR_PRESENT:
     # Mount static assets (e.g. /assets/*, CSS, JS) from Vite build
     # Expect Vite output copied to /app/static by Docker multi-stage build
     # Typical Vite structure: index.html + assets/ directory
     # We only mount the assets folder explicitly if it exists to avoid 404 noise
-    assets_path = os.path.join(STATIC_DIR, "assets")
-    if os.path.isdir(assets_path):
-        app.mount("/assets", StaticFiles(directory=assets_path), name="assets")
+    if _ASSETS_PRESENT:
+        # check_dir=False: the startup stat already verified the path
+        app.mount(
+            "/assets",
+            PrecompressedStaticFiles(directory=_ASSETS_PATH, check_dir=False),
+            name="assets",
+        )
+
+    # The built index.html never changes for the life of the container
+    # image, so it is read once at startup — serving it costs no stat()
+    # and no file read per request.
+    _index_file = os.path.join(STATIC_DIR, "index.html")
+    _INDEX_BYTES = None
+    if os.path.isfile(_index_file):
+        with open(_index_file, "rb") as f:
+            _INDEX_BYTES = f.read()
 
     @app.get("/", include_in_schema=False)
     async def serve_index():  # type: ignore
         """Serve the built frontend index.html if present, otherwise fallback JSON."""
-        index_file = os.path.join(STATIC_DIR, "index.html")
-        if os.path.isfile(index_file):
-            return FileResponse(index_file, media_type="text/html")
-        return JSONResponse(
-            {
-                "status": "success",
-                "message": "Canvas Smith Backend is working (no built frontend found).",
-                "timestamp": datetime.now().isoformat(),
-                "version": "1.0.0",
-            }
+        if _INDEX_BYTES is not None:
+            return HTMLResponse(_INDEX_BYTES)
+        return ORJSONResponse(
+            {**_ROOT_FALLBACK_TEMPLATE, "timestamp": _cached_iso_timestamp()}
         )
 
 else:
     # Fallback original JSON root if we are not serving the frontend
-    @app.get("/", response_model=HealthResponse)
+    @app.get("/")
     async def root():  # type: ignore
-        return HealthResponse(
-            status="success",
-            message="Canvas Smith Backend is working! 🎨",
-            timestamp=datetime.now().isoformat(),
-            version="1.0.0",
+        return ORJSONResponse(
+            {
+                "status": "success",
+                "message": "Canvas Smith Backend is working! 🎨",
+                "timestamp": _cached_iso_timestamp(),
+                "version": settings.version,
+            }
         )
 
 
 # Health check endpoint
-@app.get("/health", response_model=HealthResponse)
+@app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring."""
-    return HealthResponse(
-        status="healthy",
-        message="Backend is healthy and running",
-        timestamp=datetime.now().isoformat(),
-        version="1.0.0",
+    return ORJSONResponse(
+        {**_HEALTH_TEMPLATE, "timestamp": _cached_iso_timestamp()}
     )
 
 
 # API status endpoint
-@app.get("/api/status", response_model=StatusResponse)
+@app.get("/api/status")
 async def api_status():
     """API status endpoint that the frontend can call."""
-    return StatusResponse(
-        backend_status="connected",
-        message="Backend is working and connected! ✅",
-        timestamp=datetime.now().isoformat(),
+    return ORJSONResponse(
+        {**_STATUS_TEMPLATE, "timestamp": _cached_iso_timestamp()}
     )
 
 
 @app.get("/api/info")
 async def api_info():
     """Get API information and deployment mode."""
-    return {
-        "name": "Canvas Smith API",
-        "version": "1.0.0",
-        "description": "Backend API for Canvas Smith application",
-        "serve_frontend": SERVE_FRONTEND,
-        "static_dir_present": os.path.isdir(STATIC_DIR),
-        "endpoints": {
-            "root": "/",
-            "health": "/health",
-            "status": "/api/status",
-            "info": "/api/info",
-            "docs": "/docs",
-        },
-        "timestamp": datetime.now().isoformat(),
-    }
+    return ORJSONResponse(
+        {**_INFO_TEMPLATE, "timestamp": _cached_iso_timestamp()}
+    )
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True, log_level="info")
+    # uvloop's libuv event loop cuts task-scheduling overhead for this
+    # I/O-bound app; fall back to the stdlib loop where it isn't available
+    # (e.g. Windows dev machines).
+    try:
+        import uvloop  # noqa: F401
+
+        loop = "uvloop"
+    except ImportError:
+        loop = "auto"
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        reload=True,
+        log_level="info",
+        loop=loop,
+    )
@@ -0,0 +1,230 @@
+"""End-to-end conversion debug harness for the running backend.
+
+Run the server (``python main.py``), then ``python test_conversion.py``
+to push a sketch through ``/api/ai/generate-code`` and the chat
+endpoint, printing everything the responses carry. The generated
+component is written to ``generated_website.vue`` for inspection.
+"""
+
+import asyncio
+import functools
+import io
+import logging
+import os
+import statistics
+import sys
+import time
+
+import httpx
+import orjson
+from PIL import Image, ImageDraw, ImageFont
+
+BASE_URL = "http://localhost:8000"
+DEFAULT_TIMEOUT = 120
+
+# Checked-in pre-rendered sketch: loading these bytes skips all the
+# ImageDraw and zlib work below. Regenerate with
+# ``create_test_sketch()[0].save(FIXTURE_PATH, compress_level=9)``.
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "test_sketch.png")
+
+# Resolved once: each draw.text() otherwise re-resolves the default font
+FONT = ImageFont.load_default()
+
+logger = logging.getLogger(__name__)
+
+
+def create_test_sketch():
+    """Draw a small landing-page sketch; return ``(image, png_bytes)``.
+
+    The sketch is pure black-on-white, so it is drawn in bilevel mode
+    ``'1'`` — 1 bit/pixel instead of RGB's 3 bytes, which makes both the
+    draw calls and the deflate pass over far less data. The RGB convert
+    happens once at the save boundary, since the AI pipeline expects a
+    plain RGB PNG.
+    """
+    img = Image.new("1", (600, 400), 1)
+    draw = ImageDraw.Draw(img)
+    # Header bar with nav links
+    draw.rectangle([20, 20, 580, 70], outline=0, width=3)
+    draw.text((40, 35), "My Website", fill=0, font=FONT)
+    draw.text((440, 35), "Home", fill=0, font=FONT)
+    draw.text((510, 35), "About", fill=0, font=FONT)
+    # Hero section with call-to-action
+    draw.rectangle([20, 90, 580, 220], outline=0, width=2)
+    draw.text((230, 130), "Welcome headline", fill=0, font=FONT)
+    draw.rectangle([240, 160, 360, 195], outline=0, width=2)
+    draw.text((265, 170), "Get started", fill=0, font=FONT)
+    # Three feature cards
+    for i, label in enumerate(("Fast", "Simple", "Open")):
+        x0 = 20 + i * 195
+        draw.rectangle([x0, 240, x0 + 175, 370], outline=0, width=2)
+        draw.text((x0 + 65, 295), label, fill=0, font=FONT)
+    # Encode once: zlib deflate dominates this function, and every caller
+    # wants the same bytes. compress_level=1 — the sketch is trivially
+    # compressible, so the deflate search at the default level is wasted.
+    rgb = img.convert("RGB")
+    with io.BytesIO() as buf:
+        rgb.save(buf, format="PNG", compress_level=1)
+        return rgb, buf.getvalue()
+
+
+@functools.lru_cache(maxsize=1)
+def _cached_png() -> bytes:
+    """Encoded sketch bytes, loaded or drawn once per process.
+
+    The checked-in fixture is preferred — a single file read, no Pillow
+    involvement at all; drawing is the fallback when the fixture is
+    missing. Bench iterations wrap the result in fresh BytesIO views — a
+    pointer wrap over the shared bytes object, not a copy.
+    """
+    if os.path.isfile(FIXTURE_PATH):
+        with open(FIXTURE_PATH, "rb") as f:
+            return f.read()
+    return create_test_sketch()[1]
+
+
+def debug_image_validation():
+    """Report what PIL sees in the sketch, without touching disk.
+
+    The attributes we care about live on the in-memory image and the
+    already-encoded bytes; there is no need for a save/reopen round-trip
+    (two syscalls plus a deflate/inflate pair) just to read them back.
+    """
+    test_image, png_bytes = create_test_sketch()
+    sys.stdout.write(
+        f"size: {test_image.size}\n"
+        f"mode: {test_image.mode}\n"
+        f"encoded: {len(png_bytes)} bytes\n"
+    )
+
+
+def _write_component(code: str) -> None:
+    with open("generated_website.vue", "w", encoding="utf-8") as f:
+        f.write(code)
+
+
+async def test_image_conversion(client: httpx.AsyncClient, png_bytes: bytes):
+    """Post the sketch to /api/ai/generate-code and dump the response."""
+    # Output is accumulated and flushed in one write per phase: dozens of
+    # print() calls each take the stdio lock and flush on newline, which
+    # adds up across bench runs.
+    out = [f"test sketch: {len(png_bytes)} bytes"]
+    # Raw bytes in the files tuple: httpx knows the length up front and
+    # sends Content-Length instead of falling back to chunked framing,
+    # and there is no buffer object to manage or rewind at all.
+    response = await client.post(
+        "/api/ai/generate-code",
+        files={"image": ("test_sketch.png", png_bytes, "image/png")},
+        data={"additional_instructions": "Clean, modern landing page"},
+    )
+    out.append(f"conversion status: {response.status_code}")
+    if not response.is_success:
+        out.append(response.text[:1000])
+        sys.stdout.write("\n".join(out) + "\n")
+        return
+
+    # orjson both ways: C-speed parse of the response bytes and a cheap
+    # indented dump of the analysis block
+    result = orjson.loads(response.content)
+    generated_code = result.get("generated_code", "")
+    out.append(f"generated {len(generated_code)} chars")
+    out.append(f"token_usage: {result.get('token_usage')}")
+    # The multi-KB dumps only serialize when someone asked for them
+    # (LOG_LEVEL=DEBUG); INFO runs skip the orjson call entirely
+    if logger.isEnabledFor(logging.DEBUG):
+        analysis = orjson.dumps(
+            result.get("component_analysis"), option=orjson.OPT_INDENT_2
+        ).decode()
+        out.append(f"component_analysis:\n{analysis}")
+        out.append(generated_code[:500])
+        if len(generated_code) > 500:
+            out.append("...")
+
+    if generated_code:
+        # Blocking disk write goes to a worker thread so the concurrent
+        # chat call isn't stalled behind it
+        await asyncio.to_thread(_write_component, generated_code)
+        out.append("wrote generated_website.vue")
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+async def test_chat_service(client: httpx.AsyncClient):
+    """Exercise /api/ai/chat and dump the reply."""
+    response = await client.post(
+        "/api/ai/chat",
+        json={"message": "How do I add a dark theme toggle to this component?"},
+    )
+    out = [f"chat status: {response.status_code}"]
+    if response.is_success:
+        result = orjson.loads(response.content)
+        out.append(f"response: {result.get('response', '')[:300]}")
+    else:
+        out.append(response.text[:500])
+    sys.stdout.write("\n".join(out) + "\n")
+
+
+async def bench(n: int, concurrency: int):
+    """Fire ``n`` conversion requests with bounded concurrency.
+
+    Latencies are collected in a list (no printing inside the timed
+    region) and summarized as p50/p95 at the end; all requests share one
+    pooled connection per the concurrency limit.
+    """
+    png_bytes = _cached_png()
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(client: httpx.AsyncClient):
+        async with sem:
+            start = time.perf_counter()
+            response = await client.post(
+                "/api/ai/generate-code",
+                files={"image": ("test_sketch.png", png_bytes, "image/png")},
+            )
+            latencies.append(time.perf_counter() - start)
+            return response.status_code
+
+    async with httpx.AsyncClient(
+        http2=True,
+        base_url=BASE_URL,
+        timeout=DEFAULT_TIMEOUT,
+        limits=httpx.Limits(max_connections=concurrency),
+    ) as client:
+        statuses = await asyncio.gather(*(one(client) for _ in range(n)))
+
+    ok = sum(1 for s in statuses if s == 200)
+    p50 = statistics.median(latencies)
+    p95 = statistics.quantiles(latencies, n=20)[18] if len(latencies) >= 2 else p50
+    print(f"{ok}/{n} ok  p50={p50 * 1000:.0f}ms  p95={p95 * 1000:.0f}ms")
+
+
+async def main():
+    """Validate locally, then overlap the two independent HTTP calls.
+
+    Both requests spend nearly all their time waiting on AI inference, so
+    running them under one gather roughly halves wall-clock versus the
+    old sequential version — over a single multiplexed connection.
+    """
+    # The sketch self-check never changes between runs; CI sets
+    # CANVAS_SMITH_SELFCHECK=1 to run it, repeated local/bench runs skip
+    # the draw + report entirely.
+    if os.environ.get("CANVAS_SMITH_SELFCHECK"):
+        debug_image_validation()
+    png_bytes = _cached_png()
+    async with httpx.AsyncClient(
+        http2=True, base_url=BASE_URL, timeout=DEFAULT_TIMEOUT
+    ) as client:
+        await asyncio.gather(
+            test_image_conversion(client, png_bytes),
+            test_chat_service(client),
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+        asyncio.run(bench(n, concurrency))
+    else:
+        asyncio.run(main())